@@ -1,39 +1,76 @@
 import streamlit as st
+import concurrent.futures
+import itertools
 import json
-import pandas as pd
 import re
 import time
 import hashlib
 import html  # 新增：用于 HTML 转义
-from openai import OpenAI
+import diskcache
+
+try:
+    # orjson 对 LLM 返回的几 KB JSON 解析快 2-5 倍；未安装时回退标准库
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
 
 # --- 缓存配置 ---
-CACHE_SIZE_LIMIT = 10
-CACHE_TTL_SECONDS = 30
-
-# 初始化缓存
-if 'llm_cache' not in st.session_state:
-    st.session_state.llm_cache = {}
+# LLM 分析结果是确定性的，TTL 不必太短
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 1000
+# 磁盘层 TTL 可以比会话层长得多：分析结果是确定性的，失效按 key 独立进行
+DISK_CACHE_TTL_SECONDS = CACHE_TTL_SECONDS * 100
+
+# 第二层缓存：磁盘持久化，跨会话、跨 worker 重启仍然有效。
+# cache_resource 保证全进程只打开一次 sqlite 句柄，rerun 时直接复用。
+@st.cache_resource
+def _get_disk_cache():
+    return diskcache.Cache('./.llm_cache', size_limit=int(100e6))
+
+# --- 批量配置 ---
+# 单次 LLM 调用最多合并的句子数：批次太大时输出过长，延迟反而上升
+BATCH_SIZE_LIMIT = 8
 
 modelscope_key = st.secrets["modelscope"]["key"]
-# 客户端配置（请按需配置）
-modelscope_client = OpenAI(
-    base_url='https://api-inference.modelscope.cn/v1',
-    api_key=modelscope_key
-)
+
+# 客户端配置（请按需配置）。openai/httpx 推迟到首次调用再导入，缩短 worker
+# 冷启动时间；cache_resource 保证全进程只构造一次，后续调用直接复用。
+@st.cache_resource
+def _get_modelscope_client():
+    import httpx
+    from openai import OpenAI
+
+    # 显式调优的连接池：keepalive 复用连接，避免每次调用重付 TCP+TLS 握手；
+    # 并行请求（analyze_many）共享同一个池
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+    return OpenAI(
+        base_url='https://api-inference.modelscope.cn/v1',
+        api_key=modelscope_key,
+        http_client=http_client
+    )
 
 # 模型配置
 model_type = "modelscope"  # 或 "ollama"
 # model_name = "gemma3n:latest"  # ollama
 model_name = 'Qwen/Qwen3-235B-A22B-Instruct-2507'  # modelscope
 
+# --- 预编译正则（模块级，避免每次调用重新解析 pattern）---
+_MOCK_SENTENCE_RE = re.compile(r'### \*\*待分析的英文长句\*\*\n(.*)')
+
 # --- 模拟函数（仅用于演示）---
 def get_mock_json_response(prompt_content):
-    sentence_match = re.search(r'### \*\*待分析的英文长句\*\*\n(.*?)\n', prompt_content, re.DOTALL)
+    sentence_match = _MOCK_SENTENCE_RE.search(prompt_content)
     sentence = sentence_match.group(1).strip() if sentence_match else ""
 
     if not sentence:
-        return json.dumps({"error": "No sentence provided"})
+        return _dumps({"error": "No sentence provided"})
 
     res_json_dict = {
         "Source Sentence": sentence,
@@ -102,53 +139,55 @@ def get_mock_json_response(prompt_content):
             }
         ]
     }
-    return json.dumps(res_json_dict)
+    return _dumps(res_json_dict)
 
 # --- JSON 提取与校验 ---
 def extract_json_from_llm_response(raw_text):
-    # 尝试清理围栏
-    json_text = re.sub(r'^\s*```(?:json)?\s*\n*', '', raw_text, flags=re.IGNORECASE | re.DOTALL)
-    json_text = re.sub(r'\s*\n*```\s*$', '', json_text, flags=re.DOTALL)
+    # 尝试清理围栏：围栏只可能出现在首尾，纯字符串操作即可，无需正则
     try:
-        return json.loads(json_text)
-    except (json.JSONDecodeError, TypeError):
+        json_text = raw_text.strip()
+    except AttributeError:
+        return None
+    if json_text.startswith('```'):
+        json_text = json_text[3:]
+        if json_text[:4].lower() == 'json':
+            json_text = json_text[4:]
+        json_text = json_text.lstrip('\n')
+    if json_text.endswith('```'):
+        json_text = json_text[:-3].rstrip()
+    try:
+        return _loads(json_text)
+    except (ValueError, TypeError):  # 兼容 orjson/json 两种 JSONDecodeError
         return None
 
+_REQUIRED_KEYS = frozenset(["Source Sentence", "Translation", "StructureAnalysis", "Vocabulary", "Decomposition"])
+
 def validate_analysis_json(data):
-    required_keys = ["Source Sentence", "Translation", "StructureAnalysis", "Vocabulary", "Decomposition"]
-    if not isinstance(data, dict):
+    # 一次 keys 子集判断代替五次逐键查找
+    if not isinstance(data, dict) or not _REQUIRED_KEYS <= data.keys():
         return False
-    for key in required_keys:
-        if key not in data:
-            return False
-    sa = data.get("StructureAnalysis", [])
+    sa = data["StructureAnalysis"]
     if not isinstance(sa, list):
         return False
     for item in sa:
-        if not isinstance(item, dict):
+        # JSON 解析只会产生 dict 本身，type 判断比 isinstance 走得更快
+        if type(item) is not dict:
             return False
-        if item.get("highlight", False):
-            if not item.get("segment") or not item.get("role") or not item.get("explanation_cn"):
+        if item.get("highlight"):
+            if not (item.get("segment") and item.get("role") and item.get("explanation_cn")):
                 return False
     return True
 
-# --- LLM 调用（带缓存） ---
-def llm_english_analyze_with_time(englist_sentence, llm_type): 
-    cache_key = hashlib.md5(englist_sentence.encode('utf-8')).hexdigest()
-    current_time = time.time()
-    llm_cache = st.session_state.llm_cache
-
-    # 缓存检查
-    if cache_key in llm_cache:
-        cached_entry = llm_cache[cache_key]
-        if current_time - cached_entry['timestamp'] < CACHE_TTL_SECONDS:
-            st.info("ℹ️ **缓存命中**: 30秒内避免重复调用 LLM。")
-            return cached_entry['result'], 0.0
-
-    # 调用 LLM
-    start_time = time.time()
-    
-    prompt_text = """
+def _extract_and_validate(raw_text):
+    """extract+validate 流水线。调用方已按句子去重，这里无需再做记忆化。"""
+    parsed = extract_json_from_llm_response(raw_text)
+    return parsed, bool(parsed and validate_analysis_json(parsed))
+
+# --- 提示词模板（模块级常量，避免每次调用重新构造大字符串）---
+# 注意：模板必须以固定的 "### **待分析的英文长句**" 标记结尾，句子只拼接在最末尾。
+# 这样所有请求的前缀逐字节一致，服务端的 prefix-KV 缓存（vLLM 等）才能命中，
+# 共享部分的 prefill 开销接近于零。
+_PROMPT_TEMPLATE = """
 你是一位专业的英语语言学专家和高级语法分析师。你的任务是对用户提供的任何英语长难句进行彻底的、结构化的语法解析和词汇解释。
 
 ---
@@ -194,68 +233,241 @@ def llm_english_analyze_with_time(englist_sentence, llm_type):
 2.  必须严格遵循上述定义的 Key 名称和结构。
 
 ### **待分析的英文长句**
-{englist_sentence}
 """
-    prompt = prompt_text.format(englist_sentence=englist_sentence)
 
-    llm_result = None
+# --- 批量提示词：复用单句模板的指令部分，要求返回 JSON 数组 ---
+_PROMPT_INSTRUCTIONS = _PROMPT_TEMPLATE.split('### **待分析的英文长句**')[0]
+_BATCH_PROMPT_SUFFIX = """### **批量模式补充说明**
+本次需要分析多个句子。请对下面按 [序号] 列出的每个英文长句分别进行分析，
+并返回一个**纯粹的 JSON 数组**：数组的第 i 个元素即第 [i] 个句子的分析结果，
+其结构与上述定义的 JSON 对象完全一致。数组长度必须等于句子数量。
+
+### **待分析的英文长句列表**
+"""
+
+def _build_batch_prompt(sentences):
+    numbered = '\n'.join(f'[{i}] {s}' for i, s in enumerate(sentences, 1))
+    return _PROMPT_INSTRUCTIONS + _BATCH_PROMPT_SUFFIX + numbered
+
+def _cache_key_for(sentence, llm_type, model):
+    """
+    (句子, 服务商, 模型) → 缓存键。句子先折叠内部空白：用户只改动了空格/换行
+    的重复输入仍命中同一条目（缓存结果里的 Source Sentence 保留 LLM 看到的原文）。
+    llm_type/model 参与键：切换服务商或模型做对比时互不污染。
+    blake2b 比 md5 更快，8 字节原始摘要足够区分缓存条目，且省掉 hex 编码。
+    """
+    normalized = " ".join(sentence.split())
+    payload = f"{llm_type}\x00{model}\x00{normalized}".encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=8).digest()
+
+# --- LLM 调用（带缓存） ---
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_llm_analyze(englist_sentence, llm_type, model):
+    """
+    句子 → 已校验的分析 dict。st.cache_data 按 (句子, 服务商, 模型) 做全进程
+    内存缓存，跨会话生效：两个用户分析同一个句子只调一次 LLM。
+    磁盘层 diskcache 在其下兜底（同样按三元组取键），跨重启仍有效。
+    结果非法时抛 ValueError，避免把失败缓存住。
+
+    注意：必须保持纯函数、不产生任何 st 元素——cache_data 会录制缓存函数内
+    发出的全部元素消息并在每次命中时重放。流式渲染在 _stream_and_store 里做。
+    """
+    cache_key = _cache_key_for(englist_sentence, llm_type, model)
+    disk_result = _get_disk_cache().get(cache_key)
+    if disk_result is not None:
+        return disk_result
+
+    prompt = _PROMPT_TEMPLATE + englist_sentence
+
+    match llm_type:
+        case "modelscope":
+            extra_body = {"enable_thinking": False, "thinking_budget": 1024}
+            response = _get_modelscope_client().chat.completions.create(
+                model=model,
+                messages=[{'role': 'user', 'content': prompt}],
+                stream=False,
+                extra_body=extra_body
+            )
+            llm_result = response.choices[0].message.content
+        case _:
+            llm_result = get_mock_json_response(prompt)
+
+    json_result, is_valid = _extract_and_validate(llm_result)
+    if not is_valid:
+        raise ValueError("LLM 返回结果为空或 JSON 格式非法")
+
+    _get_disk_cache().set(cache_key, json_result, expire=DISK_CACHE_TTL_SECONDS)
+    return json_result
+
+def _stream_and_store(englist_sentence, llm_type):
+    """
+    缓存未命中时的真实调用路径：流式接收、边生成边渲染以缩短感知延迟，
+    校验后写入磁盘缓存。只能在主线程、缓存函数之外执行。
+    """
+    prompt = _PROMPT_TEMPLATE + englist_sentence
+    extra_body = {"enable_thinking": False, "thinking_budget": 1024}
+    response = _get_modelscope_client().chat.completions.create(
+        model=model_name,
+        messages=[{'role': 'user', 'content': prompt}],
+        stream=True,
+        extra_body=extra_body
+    )
+    stream_placeholder = st.empty()
+    buf = []
+    for chunk in response:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            buf.append(delta)
+            stream_placeholder.markdown(''.join(buf))
+    stream_placeholder.empty()
+    llm_result = ''.join(buf)
+
+    json_result, is_valid = _extract_and_validate(llm_result)
+    if not is_valid:
+        raise ValueError("LLM 返回结果为空或 JSON 格式非法")
+    _get_disk_cache().set(_cache_key_for(englist_sentence, llm_type, model_name), json_result,
+                          expire=DISK_CACHE_TTL_SECONDS)
+
+def llm_english_analyze_with_time(englist_sentence, llm_type):
+    """
+    _cached_llm_analyze 的计时薄包装。
+    返回 (json_result, elapsed_time, is_cached)；非 None 的结果都已通过校验，
+    失败（网络错误、JSON 非法）时返回 (None, 0.0, False) 并展示错误。
+    """
+    normalized = " ".join(englist_sentence.split())
+    start_time = time.time()
+    streamed = False
     try:
-        match llm_type:
-            case "modelscope":
-                extra_body = {"enable_thinking": False, "thinking_budget": 1024}
-                response = modelscope_client.chat.completions.create(
-                    model=model_name,
-                    messages=[{'role': 'user', 'content': prompt}],
-                    stream=False,
-                    extra_body=extra_body
-                )
-                llm_result = response.choices[0].message.content
-            case _:
-                llm_result = get_mock_json_response(prompt)
+        if llm_type == "modelscope" and \
+                _get_disk_cache().get(_cache_key_for(normalized, llm_type, model_name)) is None:
+            # 真缺失：在主线程流式调用并渲染，结果落入磁盘层，
+            # 随后 _cached_llm_analyze 从磁盘读出并记入内存缓存
+            _stream_and_store(normalized, llm_type)
+            streamed = True
+        json_result = _cached_llm_analyze(normalized, llm_type, model_name)
     except Exception as e:
         st.error(f"LLM 调用失败: {e}")
-        return None, 0.0
-
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    
-    json_result = extract_json_from_llm_response(llm_result)
-
-    # 更新缓存
-    if json_result and validate_analysis_json(json_result):
-        llm_cache_keys = list(llm_cache.keys())
-        if len(llm_cache_keys) >= CACHE_SIZE_LIMIT:
-            oldest_key = min(llm_cache_keys, key=lambda k: llm_cache[k]['timestamp'])
-            del llm_cache[oldest_key]
-        llm_cache[cache_key] = {
-            'result': json_result,
-            'timestamp': current_time
-        }
-
-    return json_result, elapsed_time
+        return None, 0.0, False
+    elapsed_time = time.time() - start_time
+
+    if llm_type == "modelscope" and not streamed:
+        st.info("ℹ️ **缓存命中**: 近期已分析过该句，避免重复调用 LLM。")
+        return json_result, 0.0, True
+    return json_result, elapsed_time, False
+
+# --- 批量 LLM 调用（带缓存） ---
+def llm_english_analyze_batch_with_time(sentences, llm_type):
+    """
+    把多个句子合并进一次 LLM 调用（row-marshaling），摊薄每次请求的固定开销。
+    返回 (results, elapsed_time)，results 与 sentences 等长，失败的句子对应 None；
+    每个句子的结果按单句 key 写入磁盘缓存，之后的单句请求可以直接命中。
+    """
+    results = [None] * len(sentences)
+    pending = []  # (原始下标, 句子)
+    for i, sentence in enumerate(sentences):
+        disk_result = _get_disk_cache().get(_cache_key_for(sentence, llm_type, model_name))
+        if disk_result is not None:
+            results[i] = disk_result
+        else:
+            pending.append((i, sentence))
+
+    if not pending:
+        st.info("ℹ️ **缓存命中**: 全部句子近期都已分析过。")
+        return results, 0.0
+
+    start_time = time.time()
+    # 按 BATCH_SIZE_LIMIT 分片，避免单次输出过长
+    for chunk_start in range(0, len(pending), BATCH_SIZE_LIMIT):
+        chunk = pending[chunk_start:chunk_start + BATCH_SIZE_LIMIT]
+        prompt = _build_batch_prompt([s for _, s in chunk])
+
+        llm_result = None
+        try:
+            match llm_type:
+                case "modelscope":
+                    extra_body = {"enable_thinking": False, "thinking_budget": 1024}
+                    response = _get_modelscope_client().chat.completions.create(
+                        model=model_name,
+                        messages=[{'role': 'user', 'content': prompt}],
+                        stream=False,
+                        extra_body=extra_body
+                    )
+                    llm_result = response.choices[0].message.content
+                case _:
+                    # 模拟模式不支持批量，逐句拼出等价的 JSON 数组
+                    llm_result = _dumps([
+                        _loads(get_mock_json_response(_PROMPT_TEMPLATE + s))
+                        for _, s in chunk
+                    ])
+        except Exception as e:
+            st.error(f"LLM 调用失败: {e}")
+            continue
+
+        parsed = extract_json_from_llm_response(llm_result)
+        if not isinstance(parsed, list):
+            continue
+
+        for (i, sentence), item in zip(chunk, parsed):
+            if item and validate_analysis_json(item):
+                results[i] = item
+                _get_disk_cache().set(_cache_key_for(sentence, llm_type, model_name), item, expire=DISK_CACHE_TTL_SECONDS)
+
+    elapsed_time = time.time() - start_time
+    return results, elapsed_time
+
+# --- 并行多句分析（批量合并的替代路径） ---
+def _analyze_one(sentence, llm_type):
+    """
+    线程池工作函数。工作线程没有 ScriptRunContext，不能触碰任何 st 元素，
+    所以只调用纯函数 _cached_llm_analyze，把异常转成错误文本随结果返回，
+    由主线程统一渲染。
+    """
+    try:
+        return _cached_llm_analyze(" ".join(sentence.split()), llm_type, model_name), None
+    except Exception as e:
+        return None, str(e)
+
+def analyze_many(sentences, llm_type):
+    """
+    对每个句子独立发起 LLM 请求，用线程池并行等待网络 IO。
+    当批量合并的 prompt 可能超出上下文限制（句子很长）时使用本路径；
+    HTTP 是 IO 密集操作，并发数在服务商限流内可获得接近线性的加速。
+    返回 (results, elapsed_time)，results 与 sentences 等长，失败的句子对应 None。
+    """
+    start_time = time.time()
+    # max_workers=8：不超过服务商的并发/RPM 上限
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
+        futures = [ex.submit(_analyze_one, s, llm_type) for s in sentences]
+        outcomes = [f.result() for f in futures]
+
+    # 回到主线程后再渲染每句的失败详情
+    results = []
+    for sentence, (json_result, error) in zip(sentences, outcomes):
+        if error:
+            st.error(f"LLM 调用失败（{sentence[:50]}…）: {error}")
+        results.append(json_result)
+    return results, time.time() - start_time
 
 # --- ✅ 修复核心：安全高亮函数 ---
+# span 模板的静态片段（模块级常量，渲染循环里只拼接动态部分）
+_SPAN_OPEN = '<span class="custom-tooltip" data-tooltip="'
+_SPAN_STYLE = '" style="background-color: '
+_SPAN_STYLE_REST = '; border-bottom: 2px solid #ffbf00; padding: 2px 0; margin-right: 2px;">'
+
 def create_instant_hover_highlight(segment: str, tooltip_content: str, color: str) -> str:
     """
     安全生成带 Tooltip 的高亮 HTML，防止 XSS 和渲染失败。
     """
-    # 🔒 核心：严格转义用户内容
-    escaped_segment = html.escape(segment.strip())
-    escaped_tooltip = html.escape(tooltip_content.strip(), quote=True)
-    
-    # 使用紧凑格式，避免多余空格/换行
-    return (
-        f'<span class="custom-tooltip" '
-        f'data-tooltip="{escaped_tooltip}" '
-        f'style="'
-        f'background-color: {color}; '
-        f'border-bottom: 2px solid #ffbf00; '
-        f'padding: 2px 0; '
-        f'margin-right: 2px;'
-        f'">'
-        f'{escaped_segment}'
-        f'</span>'
-    )
+    # 🔒 核心：严格转义用户内容；单次 join 拼接，避免逐段 f-string 插值
+    return ''.join((
+        _SPAN_OPEN,
+        html.escape(tooltip_content.strip(), quote=True),
+        _SPAN_STYLE,
+        color,
+        _SPAN_STYLE_REST,
+        html.escape(segment.strip()),
+        '</span>',
+    ))
 
 # --- CSS 样式 ---
 CUSTOM_CSS = """
@@ -354,7 +566,13 @@ CUSTOM_CSS = """
 }
 </style>
 """
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+# cache_resource 让 CSS 注入只真正执行一次，rerun 时走 Streamlit 的元素重放，
+# 避免每次交互重新发送 ~2 KB 的 CSS 并触发浏览器重新解析
+@st.cache_resource
+def _inject_css():
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+_inject_css()
 
 # --- 页面配置 ---
 st.set_page_config(layout="wide", page_title="英语长难句分析工具")
@@ -362,32 +580,19 @@ st.title("📚 英语长难句深度分析器")
 st.subheader(f"基于结构化 JSON 输出的解析和可视化 | LLM: **{model_type}** ***{model_name}***")
 
 default_sentence = "Although the manifesto pledged that henceforth no law would go into effect without the approval of a popularly elected legislature, the Court seemed unaware that this pledge entailed a constitutional charter."
-sentence_input = st.text_area("输入英文长难句:", default_sentence, height=100)
+sentence_input = st.text_area("输入英文长难句（每行一句，多行将合并为一次批量分析）:", default_sentence, height=100)
+parallel_mode = st.checkbox("并行模式：多句时逐句独立请求（句子很长、批量 prompt 可能超限时使用）", value=False)
 
-if st.button("开始分析", type="primary"):
-    if not sentence_input.strip():
-        st.error("请输入一个英文句子进行分析。")
-        st.stop()
+HIGHLIGHT_COLORS = ["#fce8a9", "#a9fce8", "#e8a9fc", "#fcd9a9"]
 
-    with st.spinner("正在调用 LLM 或检查缓存..."):
-        analysis_json, elapsed_time = llm_english_analyze_with_time(sentence_input.strip(), llm_type=model_type) 
-    
-    if analysis_json is None or not validate_analysis_json(analysis_json):
-        st.error("❌ 分析失败：LLM 返回结果为空或 JSON 格式非法。")
-        if analysis_json:
-            st.json(analysis_json)
-        st.stop()
-    
-    if elapsed_time > 0.0:
-        st.info(f"⏱️ **LLM 分析耗时**: **{elapsed_time:.2f}** 秒")
-    
+# --- 单个分析结果的渲染 ---
+def render_analysis(analysis_json, input_sentence):
     source_sentence_llm = analysis_json.get("Source Sentence", "").strip()
-    if source_sentence_llm and source_sentence_llm != sentence_input.strip():
+    # 缓存键折叠了空白，仅空白不同的重复输入会命中同一条目；
+    # 对比时两边同样折叠，避免对这种命中误报"句子不同"
+    if source_sentence_llm and " ".join(source_sentence_llm.split()) != " ".join(input_sentence.split()):
         st.warning(f"⚠️ LLM 处理的句子与输入略有不同：\n`{source_sentence_llm}`")
 
-    st.success("✅ 分析完成！")
-    st.divider()
-
     # --- 1. 翻译 ---
     st.header("1. 🔧 中文翻译 (Translation)")
     st.info(analysis_json.get("Translation", "N/A"))
@@ -398,28 +603,20 @@ if st.button("开始分析", type="primary"):
     st.caption("悬停高亮部分查看语法角色与解释")
 
     structure_data = analysis_json.get("StructureAnalysis", [])
-    HIGHLIGHT_COLORS = ["#fce8a9", "#a9fce8", "#e8a9fc", "#fcd9a9"]
-    color_index = 0
-    highlighted_parts = []
+    # 颜色按"第几个高亮片段"循环，与下方卡片视图保持一致
+    _color_counter = itertools.count()
 
-    for item in structure_data:
+    def _render_seg(item):
         segment = item.get("segment", "")
-        is_highlight = item.get("highlight", False)
-        
-        if is_highlight and segment.strip():
-            color = HIGHLIGHT_COLORS[color_index % len(HIGHLIGHT_COLORS)]
-            color_index += 1
-            role = item.get("role", "结构")
-            explanation = item.get("explanation_cn", "无解释")
-            tooltip = f"【{role}】: {explanation}"
-            highlighted_parts.append(create_instant_hover_highlight(segment, tooltip, color))
-        else:
-            # 非高亮部分也 escape，防尖括号破坏
-            escaped_plain = html.escape(segment)
-            highlighted_parts.append(escaped_plain)
-    
-    # 拼接为紧凑 HTML 字符串
-    highlighted_sentence = "".join(highlighted_parts).strip()
+        if item.get("highlight", False) and segment.strip():
+            color = HIGHLIGHT_COLORS[next(_color_counter) % len(HIGHLIGHT_COLORS)]
+            tooltip = f"【{item.get('role', '结构')}】: {item.get('explanation_cn', '无解释')}"
+            return create_instant_hover_highlight(segment, tooltip, color)
+        # 非高亮部分也 escape，防尖括号破坏
+        return html.escape(segment)
+
+    # 生成器直接交给 join 拼接为紧凑 HTML 字符串，不物化中间列表
+    highlighted_sentence = "".join(_render_seg(item) for item in structure_data).strip()
 
     st.markdown("**原句:**")
     # ✅ 关键：使用 st.html() 渲染（Streamlit ≥1.34）
@@ -434,18 +631,20 @@ if st.button("开始分析", type="primary"):
     st.header("2b. 🎴 高亮片段卡片展示")
     st.caption("每张卡片显示原句中的一个高亮部分及其语法角色与解释")
 
+    # 所有卡片拼成一个 HTML 块，只触发一次 Streamlit 组件消息
     color_index = 0
-    for idx, item in enumerate(structure_data):
+    card_parts = []
+    for item in structure_data:
         segment = item.get("segment", "").strip()
         is_highlight = item.get("highlight", False)
-        
+
         if is_highlight and segment:
             color = HIGHLIGHT_COLORS[color_index % len(HIGHLIGHT_COLORS)]
             color_index += 1
             role = item.get("role", "结构")
             explanation = item.get("explanation_cn", "无解释")
-            
-            card_html = f"""
+
+            card_parts.append(f"""
             <div style="
                 background-color: {color};
                 padding: 12px 16px;
@@ -457,11 +656,14 @@ if st.button("开始分析", type="primary"):
                 <strong>角色:</strong> {role}<br>
                 <strong>解释:</strong> {explanation}
             </div>
-            """
-            try:
-                st.html(card_html)
-            except AttributeError:
-                st.markdown(card_html, unsafe_allow_html=True)
+            """)
+
+    if card_parts:
+        cards_html = "".join(card_parts)
+        try:
+            st.html(cards_html)
+        except AttributeError:
+            st.markdown(cards_html, unsafe_allow_html=True)
 
     st.divider()
 
@@ -469,15 +671,63 @@ if st.button("开始分析", type="primary"):
     st.header("3. 🔑 核心词汇 (Key Vocabulary)")
     vocab_data = analysis_json.get("Vocabulary", [])
     if vocab_data:
-        df_vocab = pd.DataFrame(vocab_data)
-        df_vocab.columns = ["词汇 (Word)", "词性 (POS)", "定义 (Definition)", "示例 (Example)"]
-        st.table(df_vocab)
+        # st.table 直接接受 list-of-dicts，几行数据不值得构造 DataFrame
+        st.table([{
+            "词汇 (Word)": v.get("word", ""),
+            "词性 (POS)": v.get("pos", ""),
+            "定义 (Definition)": v.get("definition", ""),
+            "示例 (Example)": v.get("example", "")
+        } for v in vocab_data])
     st.divider()
 
     # --- 4. 拆解 ---
     st.header("4. ✨ 句子拆解 (Sentence Decomposition)")
     decomp_data = analysis_json.get("Decomposition", [])
     if decomp_data:
-        df_decomp = pd.DataFrame(decomp_data)
-        df_decomp.columns = ["ID", "功能 (Function)", "拆解后的简单英文句 (Simplified English Sentence)"]
-        st.table(df_decomp)
\ No newline at end of file
+        st.table([{
+            "ID": d.get("id", ""),
+            "功能 (Function)": d.get("function", ""),
+            "拆解后的简单英文句 (Simplified English Sentence)": d.get("simplified_sentence_en", "")
+        } for d in decomp_data])
+
+if st.button("开始分析", type="primary"):
+    # 每个非空行视为一个句子；多行走批量模式
+    sentences = [line.strip() for line in sentence_input.splitlines() if line.strip()]
+    if not sentences:
+        st.error("请输入一个英文句子进行分析。")
+        st.stop()
+
+    if len(sentences) == 1:
+        with st.spinner("正在调用 LLM 或检查缓存..."):
+            analysis_json, elapsed_time, is_cached = llm_english_analyze_with_time(sentences[0], llm_type=model_type)
+
+        # 返回的非 None 结果都已校验过（非法结果在调用层即报错）
+        if analysis_json is None:
+            st.error("❌ 分析失败：LLM 返回结果为空或 JSON 格式非法。")
+            st.stop()
+
+        if elapsed_time > 0.0:
+            st.info(f"⏱️ **LLM 分析耗时**: **{elapsed_time:.2f}** 秒")
+
+        st.success("✅ 分析完成！")
+        st.divider()
+        render_analysis(analysis_json, sentences[0])
+    else:
+        with st.spinner(f"正在批量分析 {len(sentences)} 个句子..."):
+            if parallel_mode:
+                results, elapsed_time = analyze_many(sentences, llm_type=model_type)
+            else:
+                results, elapsed_time = llm_english_analyze_batch_with_time(sentences, llm_type=model_type)
+
+        if elapsed_time > 0.0:
+            st.info(f"⏱️ **LLM 分析耗时**: **{elapsed_time:.2f}** 秒")
+
+        st.success("✅ 分析完成！")
+        for idx, (sentence, analysis_json) in enumerate(zip(sentences, results), 1):
+            st.divider()
+            with st.expander(f"句子 {idx}: {sentence}", expanded=True):
+                # 批量/并行路径返回的非 None 结果都已校验过
+                if analysis_json is None:
+                    st.error("❌ 该句分析失败：LLM 返回结果为空或 JSON 格式非法。")
+                else:
+                    render_analysis(analysis_json, sentence)